@@ -0,0 +1,102 @@
+"""
+Benchmark streamed output framing for the web API.
+
+Feeds a synthetic token stream through the old per-delta `json.dumps` path
+and through `easyopenchat.web.stream_frames`, writing every frame to a local
+socket the way the server would. Reports frames (one socket write each),
+frames/sec, bytes on the wire, and CPU and wall time per streamed response.
+
+CPU is measured for the whole process. With `--delay-ms` above 0 it also
+includes the fake generator's sleep and wakeup cost, so use the default
+unpaced run to compare framing overhead.
+
+Usage:
+    python benchmarks/stream_benchmark.py [--tokens 2000] [--delay-ms 0] [--runs 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from easyopenchat.web import stream_frames
+
+def fake_tokens(count, delay):
+    """Yield `count` short tokens, sleeping `delay` seconds between them."""
+    for i in range(count):
+        if delay:
+            time.sleep(delay)
+        yield f" tok{i % 10}"
+
+async def baseline_frames(chunks):
+    """The original /chat stream: one NDJSON frame per upstream delta."""
+    for chunk in chunks:
+        yield json.dumps({"chunk": chunk}) + "\n"
+
+async def read_all(sock):
+    loop = asyncio.get_running_loop()
+    while await loop.sock_recv(sock, 65536):
+        pass
+
+async def run_once(frames_source):
+    """Send every frame with its own socket write, as the ASGI server does."""
+    loop = asyncio.get_running_loop()
+    server_sock, client_sock = socket.socketpair()
+    server_sock.setblocking(False)
+    client_sock.setblocking(False)
+    sink = asyncio.ensure_future(read_all(client_sock))
+
+    frames = 0
+    size = 0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    async for frame in frames_source:
+        data = frame.encode("utf-8")
+        await loop.sock_sendall(server_sock, data)
+        frames += 1
+        size += len(data)
+    server_sock.close()
+    await sink
+    client_sock.close()
+    return frames, size, time.perf_counter() - wall, time.process_time() - cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    delay = args.delay_ms / 1000
+
+    cases = [
+        ("baseline", "ndjson", None),
+        ("ndjson", "ndjson", (0, 0)),
+        ("ndjson", "ndjson", (0.02, 256)),
+        ("sse", "sse", (0, 0)),
+        ("sse", "sse", (0.02, 256)),
+    ]
+    print(f"{'path':<10}{'coalesce':>12}{'frames':>9}{'frames/s':>11}{'bytes':>10}{'cpu ms':>9}{'wall ms':>9}")
+    for name, fmt, limits in cases:
+        results = []
+        for _ in range(args.runs):
+            tokens = fake_tokens(args.tokens, delay)
+            if limits is None:
+                source = baseline_frames(tokens)
+            else:
+                source = stream_frames(tokens, fmt, *limits)
+            results.append(asyncio.run(run_once(source)))
+        frames, size, wall, cpu = (sum(r[i] for r in results) / args.runs for i in range(4))
+        if limits is None:
+            label = "-"
+        elif limits[0]:
+            label = f"{limits[0] * 1000:g}ms/{limits[1]}B"
+        else:
+            label = "off"
+        print(f"{name:<10}{label:>12}{frames:>9.0f}{frames / wall:>11.0f}{size:>10.0f}{cpu * 1000:>9.1f}{wall * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
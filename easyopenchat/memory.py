@@ -30,6 +30,7 @@
 
 import json
 import os
+import threading
 from datetime import datetime
 
 class Memory:
@@ -44,35 +45,41 @@ class Memory:
         self.memory_file = memory_file
         self.max_history = max_history
         self.history = []
+        # Streamed replies are recorded from worker threads (see web.py),
+        # so history updates and file rewrites must not interleave.
+        self._lock = threading.RLock()
         self.load()
 
     def load(self):
         """Load chat history from file."""
-        if os.path.exists(self.memory_file):
-            try:
-                with open(self.memory_file, "r") as f:
-                    self.history = json.load(f)
-            except json.JSONDecodeError:
-                self.history = []
-        self._prune_history()
+        with self._lock:
+            if os.path.exists(self.memory_file):
+                try:
+                    with open(self.memory_file, "r") as f:
+                        self.history = json.load(f)
+                except json.JSONDecodeError:
+                    self.history = []
+            self._prune_history()
 
     def save(self):
         """Save chat history to file."""
-        self._prune_history()
-        try:
-            with open(self.memory_file, "w") as f:
-                json.dump(self.history, f, indent=2)
-        except Exception:
-            pass
+        with self._lock:
+            self._prune_history()
+            try:
+                with open(self.memory_file, "w") as f:
+                    json.dump(self.history, f, indent=2)
+            except Exception:
+                pass
 
     def add(self, role, content):
         """Add a message to history."""
-        self.history.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        self.save()
+        with self._lock:
+            self.history.append({
+                "role": role,
+                "content": content,
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            self.save()
 
     def _prune_history(self):
         """Prune history to maintain max_history limit."""
@@ -82,5 +89,6 @@ class Memory:
 
     def reset(self):
         """Reset chat history."""
-        self.history = []
-        self.save()
\ No newline at end of file
+        with self._lock:
+            self.history = []
+            self.save()
\ No newline at end of file
@@ -1,14 +1,29 @@
-
-
 from fastapi import FastAPI, Request
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal
 from .chatbot import EasyChatBot
 from starlette.responses import StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
+import os
+import threading
 
 app = FastAPI(title="EasyOpenChat API")
 bot = None
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+# Each streamed response holds one worker thread while reading the model, so
+# up to STREAM_WORKERS streams call into the shared bot concurrently. Memory
+# serializes its own updates; turns from concurrent streams still interleave
+# in the shared history.
+STREAM_WORKERS = int(os.environ.get("EASYOPENCHAT_STREAM_WORKERS", "64"))
+stream_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="easyopenchat-stream")
+
 class ConfigRequest(BaseModel):
     api_key: str
     model: str = "google/gemini-2.0-flash-exp:free"
@@ -18,6 +33,161 @@ class ConfigRequest(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     stream: bool = False
+    format: Literal["ndjson", "sse"] = "ndjson"
+    flush_interval_ms: int = Field(20, ge=0)
+    flush_bytes: int = Field(256, ge=0)
+
+def encode_frame(text, fmt="ndjson"):
+    """
+    Serialize a piece of streamed text as a single output frame.
+    
+    Args:
+        text (str): Text to send.
+        fmt (str): "ndjson" or "sse".
+    
+    Returns:
+        str: Encoded frame.
+    """
+    payload = json.dumps({"chunk": text})
+    if fmt == "sse":
+        return f"data: {payload}\n\n"
+    return payload + "\n"
+
+class _ChunkCoalescer:
+    """
+    Batch a blocking chunk iterator on a worker thread.
+    
+    The worker appends chunks to a shared buffer and only wakes the event
+    loop when a frame is due: for the first chunk, when `flush_bytes` is
+    reached, or once per `flush_interval` via a single loop timer armed when
+    the buffer goes from empty to non-empty.
+    """
+
+    def __init__(self, loop, flush_interval, flush_bytes):
+        self.loop = loop
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.coalesce = flush_interval > 0 and flush_bytes > 0
+        self.lock = threading.Lock()
+        self.parts = []
+        self.pending_bytes = 0
+        self.wake_pending = False
+        self.done = False
+        self.error = None
+        self.ready = asyncio.Event()
+        self.timer = None
+
+    def pump(self, chunks):
+        """Read `chunks` to the end on the calling (worker) thread."""
+        first = True
+        error = None
+        try:
+            for chunk in chunks:
+                with self.lock:
+                    self.parts.append(chunk)
+                    if self.coalesce and not first:
+                        self.pending_bytes += len(chunk.encode("utf-8"))
+                        flush_now = self.pending_bytes >= self.flush_bytes
+                    else:
+                        flush_now = True
+                    first = False
+                    if flush_now:
+                        notify = None if self.wake_pending else self._wake
+                        self.wake_pending = True
+                    else:
+                        notify = self._arm if len(self.parts) == 1 else None
+                if notify:
+                    self.loop.call_soon_threadsafe(notify)
+        except BaseException as e:
+            error = e
+        finally:
+            with self.lock:
+                self.done = True
+                self.error = error
+            self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        self.ready.set()
+
+    def _arm(self):
+        if self.timer is None:
+            self.timer = self.loop.call_later(self.flush_interval, self._wake)
+
+    async def drain(self):
+        """
+        Wait until a frame is due and take everything buffered so far.
+        
+        Returns:
+            tuple: (list of chunks, done flag, upstream error or None).
+        """
+        await self.ready.wait()
+        self.ready.clear()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        with self.lock:
+            parts, self.parts = self.parts, []
+            self.pending_bytes = 0
+            self.wake_pending = False
+            return parts, self.done, self.error
+
+async def coalesce_chunks(chunks, flush_interval=0.02, flush_bytes=256):
+    """
+    Group streamed text chunks into larger pieces.
+    
+    The first chunk is always passed through immediately, together with
+    anything that arrived before the event loop picked it up. After that, chunks
+    are buffered until `flush_bytes` bytes are pending or `flush_interval`
+    seconds have passed since the buffer became non-empty, whichever comes
+    first. Setting either limit to 0 disables coalescing.
+    
+    Upstream is read on `stream_executor`, so at most `STREAM_WORKERS`
+    responses stream at once; further ones wait for a free worker.
+    
+    Args:
+        chunks (iterable): Synchronous iterable of text chunks.
+        flush_interval (float): Maximum time to hold buffered text, in seconds.
+        flush_bytes (int): Buffered size that triggers a flush.
+    
+    Yields:
+        str: Coalesced text.
+    """
+    loop = asyncio.get_running_loop()
+    coalescer = _ChunkCoalescer(loop, flush_interval, flush_bytes)
+    # A disconnected client leaves the worker to finish the upstream stream
+    # on its own, so the chatbot still records the full reply.
+    worker = loop.run_in_executor(stream_executor, coalescer.pump, chunks)
+    while True:
+        parts, done, error = await coalescer.drain()
+        if parts:
+            if coalescer.coalesce:
+                yield "".join(parts)
+            else:
+                for part in parts:
+                    yield part
+        if error is not None:
+            raise error
+        if done:
+            break
+    await worker
+
+async def stream_frames(chunks, fmt="ndjson", flush_interval=0.02, flush_bytes=256):
+    """
+    Encode streamed text chunks as NDJSON or SSE frames.
+    
+    Args:
+        chunks (iterable): Synchronous iterable of text chunks.
+        fmt (str): "ndjson" or "sse".
+        flush_interval (float): Coalescing window in seconds.
+        flush_bytes (int): Coalescing size threshold in bytes.
+    
+    Yields:
+        str: Encoded frames.
+    """
+    async for text in coalesce_chunks(chunks, flush_interval, flush_bytes):
+        yield encode_frame(text, fmt)
+    if fmt == "sse":
+        yield "data: [DONE]\n\n"
 
 @app.post("/configure")
 async def configure(req: ConfigRequest):
@@ -31,10 +201,14 @@ async def chat(req: ChatRequest):
     if not bot:
         return {"error": "Bot not configured"}
     if req.stream:
-        async def stream_response():
-            for chunk in bot.ask(req.message, stream=True):
-                yield json.dumps({"chunk": chunk}) + "\n"
-        return StreamingResponse(stream_response(), media_type="application/x-ndjson")
+        frames = stream_frames(
+            bot.ask(req.message, stream=True),
+            fmt=req.format,
+            flush_interval=req.flush_interval_ms / 1000,
+            flush_bytes=req.flush_bytes,
+        )
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return StreamingResponse(frames, media_type=STREAM_MEDIA_TYPES[req.format], headers=headers)
     reply = bot.ask(req.message)
     return {"reply": reply}
 
@@ -43,4 +217,4 @@ async def reset():
     if not bot:
         return {"error": "Bot not configured"}
     bot.reset_memory()
-    return {"status": "history reset"}
\ No newline at end of file
+    return {"status": "history reset"}
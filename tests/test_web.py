@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from easyopenchat import web
+
+def tokens(items, error=None):
+    yield from items
+    if error:
+        raise error
+
+def gated_tokens(groups, gate):
+    """Yield each group of tokens, waiting for the consumer to release `gate` in between."""
+    for i, group in enumerate(groups):
+        if i:
+            assert gate.wait(10), "consumer never received the previous group"
+            gate.clear()
+        yield from group
+
+def collect(chunks, flush_interval=0.02, flush_bytes=256, gate=None):
+    async def run():
+        pieces = []
+        async for piece in web.coalesce_chunks(chunks, flush_interval, flush_bytes):
+            pieces.append(piece)
+            if gate:
+                gate.set()
+        return pieces
+    return asyncio.run(run())
+
+def collect_gated(groups, flush_interval, flush_bytes):
+    gate = threading.Event()
+    return collect(gated_tokens(groups, gate), flush_interval, flush_bytes, gate)
+
+class FakeBot:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def ask(self, message, stream=False):
+        if stream:
+            return tokens(self.tokens)
+        return "".join(self.tokens)
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(web, "bot", FakeBot(["Hello", " there", ",", " friend"]))
+    return TestClient(web.app)
+
+# The gated upstream only moves on once the previous frame has been received,
+# so these would stall (and fail the gate assertion) if a flush never happened.
+
+def test_first_token_is_sent_immediately():
+    pieces = collect_gated([["a"], ["b", "c"]], flush_interval=60, flush_bytes=1000)
+    assert pieces == ["a", "bc"]
+
+def test_flush_on_size():
+    groups = [["x"]] + [["abcd", "abcd"]] * 5
+    pieces = collect_gated(groups, flush_interval=60, flush_bytes=8)
+    assert pieces == ["x"] + ["abcdabcd"] * 5
+
+def test_flush_on_time_window_without_new_data():
+    pieces = collect_gated([["a"], ["b"], ["c"]], flush_interval=0.05, flush_bytes=1000)
+    assert pieces == ["a", "b", "c"]
+
+def test_trailing_flush():
+    pieces = collect_gated([["a"], ["b", "c"], ["d"]], flush_interval=60, flush_bytes=2)
+    assert pieces == ["a", "bc", "d"]
+
+def test_coalescing_off_sends_every_chunk():
+    pieces = collect(tokens(["a", "b", "c"]), flush_interval=0, flush_bytes=0)
+    assert pieces == ["a", "b", "c"]
+
+def test_upstream_error_is_raised():
+    with pytest.raises(RuntimeError, match="upstream"):
+        collect(tokens(["a", "b"], error=RuntimeError("upstream")))
+
+def test_upstream_base_exception_does_not_hang():
+    with pytest.raises(KeyboardInterrupt):
+        collect(tokens(["a"], error=KeyboardInterrupt()))
+
+def test_ndjson_stream(client):
+    r = client.post("/chat", json={"message": "hi", "stream": True})
+    assert r.headers["content-type"] == "application/x-ndjson"
+    chunks = [json.loads(line)["chunk"] for line in r.text.splitlines()]
+    assert chunks[0].startswith("Hello")
+    assert "".join(chunks) == "Hello there, friend"
+
+def test_sse_stream(client):
+    r = client.post("/chat", json={"message": "hi", "stream": True, "format": "sse", "flush_bytes": 0})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = r.text.split("\n\n")
+    assert events[-2:] == ["data: [DONE]", ""]
+    chunks = [json.loads(e[len("data: "):])["chunk"] for e in events[:-2]]
+    assert chunks == ["Hello", " there", ",", " friend"]
+
+def test_unknown_stream_format(client):
+    r = client.post("/chat", json={"message": "hi", "stream": True, "format": "xml"})
+    assert r.status_code == 422
+
+@pytest.mark.parametrize("field", ["flush_interval_ms", "flush_bytes"])
+def test_negative_flush_limits_are_rejected(client, field):
+    r = client.post("/chat", json={"message": "hi", "stream": True, field: -1})
+    assert r.status_code == 422